@@ -1,6 +1,20 @@
-from functools import wraps
-from typing import Any, Callable, Optional, Type, Union, List, Dict
+import asyncio
+import copy
+import hashlib
+import inspect
+import json
+import math
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, wraps
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Type, Union
 from pydantic import BaseModel
+from pydantic_core import PydanticSerializationError, to_jsonable_python
 from openai import OpenAI, AsyncOpenAI
 
 
@@ -43,6 +57,246 @@ def _disallow_additional_properties(schema: Any) -> Any:
     return schema
 
 
+# Structured-output payloads per response_format class. Keys are weak so that
+# models created on the fly (e.g. with `create_model`) can still be collected.
+_schema_formats: "weakref.WeakKeyDictionary[type, dict]" = weakref.WeakKeyDictionary()
+_schema_formats_lock = threading.Lock()
+
+
+def _json_schema_format(response_format: Type[BaseModel]) -> dict:
+    """Build the OpenAI `response_format` payload for a Pydantic model.
+
+    The schema is only generated once per class. Every caller gets its own
+    copy, so nothing done to one request's payload leaks into another.
+    """
+    with _schema_formats_lock:
+        payload = _schema_formats.get(response_format)
+    if payload is None:
+        schema = _disallow_additional_properties(response_format.model_json_schema())
+        payload = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": response_format.__name__,
+                "schema": schema,
+                "strict": True
+            }
+        }
+        with _schema_formats_lock:
+            _schema_formats[response_format] = payload
+    return copy.deepcopy(payload)
+
+
+# Sentinel for cache lookups, since None can be a cached value
+_MISSING = object()
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _check_response_format(response_format: Any) -> None:
+    """Fail early, at decoration time, on a response_format that isn't a Pydantic model."""
+    if response_format is None:
+        return
+    if not (isinstance(response_format, type) and issubclass(response_format, BaseModel)):
+        raise TypeError(
+            "response_format must be a Pydantic BaseModel subclass, "
+            f"got {response_format!r}"
+        )
+
+
+def _string_prompt_builder(system: Optional[str]) -> Callable[[str], list]:
+    """Return a function that turns a string prompt into chat messages.
+
+    The branch on `system` is taken here, once per decorated function, rather
+    than on every call.
+    """
+    if not system:
+        return lambda prompt: [{"role": "user", "content": prompt}]
+    system_message = {"role": "system", "content": system}
+    return lambda prompt: [system_message, {"role": "user", "content": prompt}]
+
+
+def _canonical(obj: Any) -> Any:
+    """JSON fallback for cache keys that keeps distinct objects apart.
+
+    Pydantic models, dataclasses, datetimes, sets and the like are converted
+    by pydantic-core. Anything else falls back to its type and repr, which,
+    unlike `str`, rarely maps two different objects to the same value.
+    """
+    try:
+        return to_jsonable_python(obj)
+    except PydanticSerializationError:
+        return f"{type(obj).__module__}.{type(obj).__qualname__}:{obj!r}"
+
+
+def _messages_from_result(func: Callable, result: Any, to_messages: Callable[[str], list]) -> list:
+    """Turn the return value of a decorated function into chat messages."""
+    # Handle different return types
+    if isinstance(result, str):
+        # String: build messages with optional system prompt
+        return to_messages(result)
+    elif isinstance(result, list):
+        # List of messages: use directly
+        # System prompt is ignored if messages are provided
+        return result
+    raise ValueError(
+        f"Function {func.__name__} must return either a string prompt "
+        f"or a list of message dictionaries, got {type(result).__name__}"
+    )
+
+
+def _chunk_text(chunk: Any) -> Optional[str]:
+    """Extract the new text from a streamed completion chunk, if any."""
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+
+def _iter_text(response: Any) -> Iterator[str]:
+    """Yield the text of a streamed completion, chunk by chunk.
+
+    The stream is closed once the generator finishes or is closed early, so a
+    consumer that stops reading doesn't keep the HTTP connection open.
+    """
+    try:
+        for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+    finally:
+        response.close()
+
+
+def _cache_key(key_hasher: Any, messages: Any) -> str:
+    """Hash the messages of a request on top of its pre-seeded configuration hasher.
+
+    Copying the hasher and feeding it the messages avoids concatenating them
+    with the configuration digest, which matters for large (e.g. base64 image)
+    payloads.
+    """
+    hasher = key_hasher.copy()
+    hasher.update(json.dumps(messages, sort_keys=True, default=_canonical).encode())
+    return hasher.hexdigest()
+
+
+def _config_hasher(base_kwargs: dict) -> Any:
+    """Start a cache key hasher from the parts of a request that are fixed per decorated function."""
+    payload = json.dumps(base_kwargs, sort_keys=True, default=_canonical).encode()
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(hashlib.blake2b(payload, digest_size=16).digest())
+    return hasher
+
+
+class InMemoryCache(MutableMapping):
+    """In-memory LRU cache whose entries expire after a time-to-live.
+
+    This is what `cache=True` gives you. Once `maxsize` entries are stored the
+    least recently used one is evicted, and entries older than `ttl` seconds
+    are treated as missing (and are no longer counted or iterated over).
+
+    Attributes:
+        hits: Number of `get` lookups that found a live entry
+        misses: Number of `get` lookups that did not
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: Optional[float] = 3600):
+        """Initialize an empty cache.
+
+        Args:
+            maxsize: Maximum number of entries to keep
+            ttl: Number of seconds an entry stays valid, or None to never expire
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (expires, _) in self._data.items() if expires <= now]
+        for key in expired:
+            del self._data[key]
+
+    def _lookup(self, key: str) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the live entry for `key`, or `default`, in a single locked lookup."""
+        with self._lock:
+            item = self._lookup(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return item[1]
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            item = self._lookup(key)
+        if item is None:
+            raise KeyError(key)
+        return item[1]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._lock:
+            expires = math.inf if self.ttl is None else time.monotonic() + self.ttl
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            del self._data[key]
+
+    def __iter__(self):
+        with self._lock:
+            self._purge_expired()
+            return iter(list(self._data))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge_expired()
+            return len(self._data)
+
+
+def _resolve_cache(cache: Union[bool, str, MutableMapping, None]) -> Optional[MutableMapping]:
+    """Turn the `cache` argument of a backend into a mapping (or None)."""
+    if cache is True:
+        return InMemoryCache(maxsize=1000, ttl=3600)
+    if cache is False:
+        return None
+    if isinstance(cache, str):
+        return _open_disk_cache(os.path.abspath(cache))
+    return cache
+
+
+@lru_cache(maxsize=None)
+def _open_disk_cache(path: str) -> MutableMapping:
+    """Open a diskcache at `path`, sharing one handle per directory in this process."""
+    try:
+        from diskcache import Cache
+    except ImportError as e:
+        raise ImportError(
+            "Passing a path as `cache` requires diskcache: pip install diskcache"
+        ) from e
+    return Cache(path)
+
+
 class backend:
     """Synchronous backend decorator for LLM-powered functions.
 
@@ -51,7 +305,10 @@ class backend:
     - A string that will be used as the user prompt
     - A list of message dictionaries for full conversation control
 
-    The decorator handles calling the LLM and parsing the response.
+    The decorator handles calling the LLM and parsing the response. When a
+    `response_format` is given, the JSON reply is validated straight into that
+    Pydantic model with `model_validate_json`, so you get a model instance back
+    rather than a dict.
 
     Features:
     - Works with any OpenAI SDK-compatible provider (OpenAI, OpenRouter, etc.)
@@ -84,6 +341,7 @@ class backend:
         model: str,
         response_format: Optional[Type[BaseModel]] = None,
         system: Optional[str] = None,
+        cache: Union[bool, str, MutableMapping, None] = None,
         **kwargs
     ):
         """Initialize the backend with specific LLM configuration.
@@ -93,84 +351,200 @@ class backend:
             model: Name/identifier of the model to use (e.g., "gpt-4o-mini")
             response_format: Optional Pydantic model for structured output
             system: Optional system prompt for the LLM
+            cache: Optional cache for responses. Identical requests are answered
+                from it instead of the API. Pass `True` for an `InMemoryCache`,
+                a directory path for a diskcache, or any dict-like object.
+                The cache holds response text, so structured outputs are
+                validated again on a hit and every caller gets its own instance.
             **kwargs: Additional arguments passed to the OpenAI API (e.g., temperature, max_tokens)
         """
+        _check_response_format(response_format)
         self.client = client
         self.model = model
         self.response_format = response_format
         self.system = system
+        self.cache = _resolve_cache(cache)
         self.kwargs = kwargs
+        # Futures for cached requests that are being fetched right now
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
 
     def __call__(self, func: Callable) -> Callable:
+        if self.kwargs.get("stream"):
+            return self.stream(func)
+
+        # Everything that only depends on the backend configuration is built
+        # once per decorated function instead of on every call.
+        base_kwargs = {"model": self.model, **self.kwargs}
+        if self.response_format:
+            base_kwargs["response_format"] = _json_schema_format(self.response_format)
+        key_hasher = _config_hasher(base_kwargs)
+        to_messages = _string_prompt_builder(self.system)
+
+        # Decide once how responses are parsed, so the wrappers below don't
+        # branch on the configuration per call.
+        if self.response_format:
+            parse = self.response_format.model_validate_json
+        else:
+            parse = _identity
+        # Bind what the wrappers touch on every call to locals
+        create = self.client.chat.completions.create
+        cache = self.cache
+        inflight = self._inflight
+        lock = self._lock
+
+        def complete(call_kwargs):
+            # Call OpenAI API
+            response = create(**call_kwargs)
+            response_text = response.choices[0].message.content
+            return parse(response_text), response_text
+
+        if cache is None:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                # Call the function to get the prompt or messages
+                result = func(*args, **kwargs)
+                messages = _messages_from_result(func, result, to_messages)
+                out, _ = complete({**base_kwargs, "messages": messages})
+                return out
+
+            return wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Call the function to get the prompt or messages
             result = func(*args, **kwargs)
 
-            # Handle different return types
-            if isinstance(result, str):
-                # String: build messages with optional system prompt
-                messages = []
-                if self.system:
-                    messages.append({"role": "system", "content": self.system})
-                messages.append({"role": "user", "content": result})
-            elif isinstance(result, list):
-                # List of messages: use directly
-                # System prompt is ignored if messages are provided
-                messages = result
-            else:
-                raise ValueError(
-                    f"Function {func.__name__} must return either a string prompt "
-                    f"or a list of message dictionaries, got {type(result).__name__}"
-                )
+            messages = _messages_from_result(func, result, to_messages)
 
             # Prepare API call kwargs
-            call_kwargs = {
-                "model": self.model,
-                "messages": messages,
-                **self.kwargs
-            }
+            call_kwargs = {**base_kwargs, "messages": messages}
+
+            # Serve identical requests from the cache. Identical requests that
+            # arrive while one is in flight wait for it instead of calling the
+            # API themselves.
+            cache_key = _cache_key(key_hasher, messages)
+            # A single `get` keeps an eviction or expiry by another user of the
+            # same cache from landing between a membership check and a read.
+            with lock:
+                cached = cache.get(cache_key, _MISSING)
+                if cached is _MISSING:
+                    future = inflight.get(cache_key)
+                    leader = future is None
+                    if leader:
+                        future = inflight[cache_key] = Future()
+            if cached is not _MISSING:
+                return parse(cached)
+            if not leader:
+                return parse(future.result())
+
+            try:
+                out, response_text = complete(call_kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                # Waiters get the text even if writing it to the cache fails.
+                # Cache and share the response text rather than the parsed
+                # output: validating JSON again is cheaper than deep-copying a
+                # model, and callers can't corrupt the cache by mutating it
+                future.set_result(response_text)
+                with lock:
+                    cache[cache_key] = response_text
+            finally:
+                # Always clear the entry, or later identical calls would wait
+                # on this future forever
+                with lock:
+                    inflight.pop(cache_key, None)
+            return out
 
-            # Add structured output if specified
-            if self.response_format:
-                schema = _disallow_additional_properties(
-                    self.response_format.model_json_schema()
-                )
-                call_kwargs["response_format"] = {
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": self.response_format.__name__,
-                        "schema": schema,
-                        "strict": True
-                    }
-                }
+        return wrapper
 
-            # Call OpenAI API
-            response = self.client.chat.completions.create(**call_kwargs)
-            response_text = response.choices[0].message.content
+    def stream(self, func: Callable) -> Callable:
+        """Decorate a function so that calling it streams the response text.
 
-            # Parse response
-            if self.response_format:
-                return self.response_format.model_validate_json(response_text)
-            else:
-                return response_text
+        The decorated function sends the request right away and returns an
+        iterator over the pieces of text as the LLM generates them, so you can
+        start showing or processing output before the response is complete.
+        Passing `stream=True` to the backend makes it decorate like this by
+        default. Streamed responses are not cached, and with a
+        `response_format` the pieces make up the JSON document.
+
+        Example:
+            llm = backend(client, model="gpt-4o-mini")
+
+            @llm.stream
+            def write_story(topic: str) -> str:
+                return f"Write a story about {topic}"
+
+            for text in write_story("dragons"):
+                print(text, end="", flush=True)
+        """
+        base_kwargs = {"model": self.model, **self.kwargs, "stream": True}
+        if self.response_format:
+            base_kwargs["response_format"] = _json_schema_format(self.response_format)
+        to_messages = _string_prompt_builder(self.system)
+        create = self.client.chat.completions.create
+
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> Iterator[str]:
+            result = func(*args, **kwargs)
+            messages = _messages_from_result(func, result, to_messages)
+            response = create(**base_kwargs, messages=messages)
+            return _iter_text(response)
 
         return wrapper
 
     def run(self, func: Callable, *args, **kwargs):
         """Run a function through the backend without using it as a decorator.
 
+        The function is decorated on every call, so changes to the backend's
+        settings take effect right away. For calls in a tight loop, decorate
+        the function once instead.
+
         Args:
             func: The function to execute
             *args: Positional arguments to pass to the function
             **kwargs: Keyword arguments to pass to the function
 
         Returns:
-            The result from the LLM (parsed according to response_format)
+            An instance of `response_format` when one is set, otherwise the
+            response text
         """
         decorated_func = self(func)
         return decorated_func(*args, **kwargs)
 
+    def batch(
+        self,
+        func: Callable,
+        iterable_of_args: Iterable[tuple],
+        max_concurrency: int = 16,
+    ) -> List[Any]:
+        """Run a function through the backend for many inputs concurrently.
+
+        The chat completions API takes one conversation per request, so the
+        requests are sent from a pool of `max_concurrency` threads. Servers
+        with continuous batching (vLLM, TGI, ...) group them on their side.
+        The provider's rate limits are usually the real throttle.
+
+        Args:
+            func: The function to execute
+            iterable_of_args: Positional argument tuples, one per call
+            max_concurrency: Maximum number of requests in flight at once
+
+        Returns:
+            A list with the result of every call, in input order. Results are
+            `response_format` instances when one is set, otherwise strings.
+            With `stream=True` each stream is collected into its full text.
+        """
+        decorated_func = self(func)
+        if self.kwargs.get("stream"):
+            call = lambda args: "".join(decorated_func(*args))
+        else:
+            call = lambda args: decorated_func(*args)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            return list(pool.map(call, iterable_of_args))
+
 
 class async_backend:
     """Asynchronous backend decorator for LLM-powered functions.
@@ -183,6 +557,13 @@ class async_backend:
     - A string that will be used as the user prompt
     - A list of message dictionaries for full conversation control
 
+    The function itself may be `async def`, which is useful when building the
+    prompt involves I/O (reading files, fetching history) that should not
+    block the event loop.
+
+    As with `backend`, a `response_format` makes the call return an instance of
+    that Pydantic model.
+
     Features:
     - Async/await support for non-blocking operations
     - Works with any OpenAI SDK-compatible provider
@@ -213,6 +594,7 @@ class async_backend:
         model: str,
         response_format: Optional[Type[BaseModel]] = None,
         system: Optional[str] = None,
+        cache: Union[bool, str, MutableMapping, None] = None,
         **kwargs
     ):
         """Initialize the async backend with specific LLM configuration.
@@ -222,80 +604,231 @@ class async_backend:
             model: Name/identifier of the model to use
             response_format: Optional Pydantic model for structured output
             system: Optional system prompt for the LLM
+            cache: Optional cache for responses. Identical requests are answered
+                from it instead of the API. Pass `True` for an `InMemoryCache`,
+                a directory path for a diskcache, or any dict-like object.
+                The cache holds response text, so structured outputs are
+                validated again on a hit and every caller gets its own instance.
             **kwargs: Additional arguments passed to the OpenAI API
         """
+        _check_response_format(response_format)
         self.client = client
         self.model = model
         self.response_format = response_format
         self.system = system
+        self.cache = _resolve_cache(cache)
         self.kwargs = kwargs
+        # Futures for cached requests that are being fetched right now. A
+        # future belongs to the loop that made it, so every running loop gets
+        # its own map; it goes away with the loop.
+        self._inflight: "weakref.WeakKeyDictionary[Any, Dict[str, asyncio.Future]]" = weakref.WeakKeyDictionary()
+        self._inflight_lock = threading.Lock()
 
     def __call__(self, func: Callable) -> Callable:
+        if self.kwargs.get("stream"):
+            return self.stream(func)
+
+        # Everything that only depends on the backend configuration is built
+        # once per decorated function instead of on every call.
+        base_kwargs = {"model": self.model, **self.kwargs}
+        if self.response_format:
+            base_kwargs["response_format"] = _json_schema_format(self.response_format)
+        key_hasher = _config_hasher(base_kwargs)
+        to_messages = _string_prompt_builder(self.system)
+
+        # Decide once how responses are parsed, so the wrappers below don't
+        # branch on the configuration per call.
+        if self.response_format:
+            parse = self.response_format.model_validate_json
+        else:
+            parse = _identity
+        # Bind what the wrappers touch on every call to locals
+        create = self.client.chat.completions.create
+        cache = self.cache
+        loop_inflight = self._inflight
+        inflight_lock = self._inflight_lock
+
+        async def complete(call_kwargs):
+            # Call OpenAI API
+            response = await create(**call_kwargs)
+            response_text = response.choices[0].message.content
+            return parse(response_text), response_text
+
+        if cache is None:
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                # Call the function to get the prompt or messages
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    # Async prompt functions can do their own I/O without blocking the loop
+                    result = await result
+                messages = _messages_from_result(func, result, to_messages)
+                out, _ = await complete({**base_kwargs, "messages": messages})
+                return out
+
+            return wrapper
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # Call the function to get the prompt or messages
             result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                # Async prompt functions can do their own I/O without blocking the loop
+                result = await result
 
-            # Handle different return types
-            if isinstance(result, str):
-                # String: build messages with optional system prompt
-                messages = []
-                if self.system:
-                    messages.append({"role": "system", "content": self.system})
-                messages.append({"role": "user", "content": result})
-            elif isinstance(result, list):
-                # List of messages: use directly
-                # System prompt is ignored if messages are provided
-                messages = result
-            else:
-                raise ValueError(
-                    f"Function {func.__name__} must return either a string prompt "
-                    f"or a list of message dictionaries, got {type(result).__name__}"
-                )
+            messages = _messages_from_result(func, result, to_messages)
 
             # Prepare API call kwargs
-            call_kwargs = {
-                "model": self.model,
-                "messages": messages,
-                **self.kwargs
-            }
+            call_kwargs = {**base_kwargs, "messages": messages}
+
+            # Serve identical requests from the cache. Identical requests that
+            # arrive while one is in flight wait for it instead of calling the
+            # API themselves. No await happens between the checks and the
+            # bookkeeping, so the event loop can't interleave them.
+            cache_key = _cache_key(key_hasher, messages)
+            loop = asyncio.get_running_loop()
+            inflight = loop_inflight.get(loop)
+            if inflight is None:
+                with inflight_lock:
+                    inflight = loop_inflight.setdefault(loop, {})
+            while True:
+                cached = cache.get(cache_key, _MISSING)
+                if cached is not _MISSING:
+                    return parse(cached)
+                future = inflight.get(cache_key)
+                if future is None:
+                    break
+                # The shield keeps a waiter's own cancellation away from the
+                # shared request. A leader that gets cancelled resolves the
+                # future with _MISSING instead, and the waiters try again.
+                shared = await asyncio.shield(future)
+                if shared is not _MISSING:
+                    return parse(shared)
+            future = inflight[cache_key] = loop.create_future()
+
+            try:
+                out, response_text = await complete(call_kwargs)
+            except asyncio.CancelledError:
+                future.set_result(_MISSING)
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                # Nobody may be waiting, mark the exception as retrieved
+                future.exception()
+                raise
+            else:
+                # Waiters get the text even if writing it to the cache fails.
+                # Cache and share the response text rather than the parsed
+                # output: validating JSON again is cheaper than deep-copying a
+                # model, and callers can't corrupt the cache by mutating it
+                future.set_result(response_text)
+                cache[cache_key] = response_text
+            finally:
+                # Always clear the entry, or later identical calls would wait
+                # on this future forever
+                inflight.pop(cache_key, None)
+            return out
 
-            # Add structured output if specified
-            if self.response_format:
-                schema = _disallow_additional_properties(
-                    self.response_format.model_json_schema()
-                )
-                call_kwargs["response_format"] = {
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": self.response_format.__name__,
-                        "schema": schema,
-                        "strict": True
-                    }
-                }
+        return wrapper
 
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(**call_kwargs)
-            response_text = response.choices[0].message.content
+    def stream(self, func: Callable) -> Callable:
+        """Decorate a function so that calling it streams the response text.
 
-            # Parse response
-            if self.response_format:
-                return self.response_format.model_validate_json(response_text)
-            else:
-                return response_text
+        The decorated function is an async generator that yields pieces of text
+        as the LLM generates them. Passing `stream=True` to the backend makes
+        it decorate like this by default. Streamed responses are not cached,
+        and with a `response_format` the pieces make up the JSON document.
+
+        Example:
+            llm = async_backend(client, model="gpt-4o-mini")
+
+            @llm.stream
+            def write_story(topic: str) -> str:
+                return f"Write a story about {topic}"
+
+            async for text in write_story("dragons"):
+                print(text, end="", flush=True)
+        """
+        base_kwargs = {"model": self.model, **self.kwargs, "stream": True}
+        if self.response_format:
+            base_kwargs["response_format"] = _json_schema_format(self.response_format)
+        to_messages = _string_prompt_builder(self.system)
+        create = self.client.chat.completions.create
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> AsyncIterator[str]:
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                # Async prompt functions can do their own I/O without blocking the loop
+                result = await result
+            messages = _messages_from_result(func, result, to_messages)
+            response = await create(**base_kwargs, messages=messages)
+            try:
+                async for chunk in response:
+                    text = _chunk_text(chunk)
+                    if text:
+                        yield text
+            finally:
+                # Release the connection even when the consumer stops early
+                await response.close()
 
         return wrapper
 
     async def run(self, func: Callable, *args, **kwargs):
         """Run a function through the backend without using it as a decorator.
 
+        The function is decorated on every call, so changes to the backend's
+        settings take effect right away. For calls in a tight loop, decorate
+        the function once instead.
+
         Args:
             func: The function to execute
             *args: Positional arguments to pass to the function
             **kwargs: Keyword arguments to pass to the function
 
         Returns:
-            The result from the LLM (parsed according to response_format)
+            An instance of `response_format` when one is set, otherwise the
+            response text. With `stream=True` it's the async iterator of text
+            pieces instead, to be consumed with `async for`.
         """
         decorated_func = self(func)
-        return await decorated_func(*args, **kwargs)
+        result = decorated_func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return await result
+        # Streaming functions are async generators, hand them back unconsumed
+        return result
+
+    async def map(
+        self,
+        func: Callable,
+        iterable_of_args: Iterable[tuple],
+        max_concurrency: int = 16,
+    ) -> List[Any]:
+        """Run a function through the backend for many inputs concurrently.
+
+        Requests are sent with `asyncio.gather`, but never more than
+        `max_concurrency` at once. In practice the provider's rate limits
+        (HTTP 429 / tokens-per-minute) are the real throttle, so lower this
+        if you start seeing rate limit errors.
+
+        Args:
+            func: The function to execute
+            iterable_of_args: Positional argument tuples, one per call
+            max_concurrency: Maximum number of requests in flight at once
+
+        Returns:
+            A list with the result of every call, in input order. Results are
+            `response_format` instances when one is set, otherwise strings.
+            With `stream=True` each stream is collected into its full text.
+        """
+        decorated_func = self(func)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(args):
+            async with semaphore:
+                result = decorated_func(*args)
+                if inspect.isawaitable(result):
+                    return await result
+                return "".join([text async for text in result])
+
+        return await asyncio.gather(*[bounded(args) for args in iterable_of_args])
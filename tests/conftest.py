@@ -25,16 +25,89 @@ class MockCompletion:
         self.choices = [MockChoice(content)]
 
 
+class MockDelta:
+    """Mock OpenAI streamed delta object."""
+
+    def __init__(self, content: Optional[str]):
+        self.content = content
+
+
+class MockChunkChoice:
+    """Mock OpenAI streamed choice object."""
+
+    def __init__(self, content: Optional[str]):
+        self.delta = MockDelta(content)
+
+
+class MockChunk:
+    """Mock OpenAI streamed completion chunk."""
+
+    def __init__(self, content: Optional[str]):
+        self.choices = [MockChunkChoice(content)]
+
+
+def mock_chunks(content: str) -> list:
+    """Split content into chunks the way a streamed response arrives.
+
+    The content is split on spaces, and the stream ends with an empty
+    chunk, like the final chunk OpenAI sends.
+    """
+    words = content.split(" ")
+    pieces = [word + " " for word in words[:-1]] + [words[-1]]
+    return [MockChunk(piece) for piece in pieces] + [MockChunk(None)]
+
+
+class MockStream:
+    """Mock OpenAI stream of chunks."""
+
+    def __init__(self, chunks: list):
+        self._chunks = iter(chunks)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        self.closed = True
+
+
+class MockAsyncStream:
+    """Mock OpenAI async stream of chunks."""
+
+    def __init__(self, chunks: list):
+        self._chunks = iter(chunks)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        self.closed = True
+
+
 class MockCompletions:
     """Mock OpenAI completions interface."""
 
     def __init__(self, response_content: str):
         self.response_content = response_content
         self.calls = []
+        self.streams = []
 
     def create(self, **kwargs):
         """Mock the create method and store call arguments."""
         self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            self.streams.append(MockStream(mock_chunks(self.response_content)))
+            return self.streams[-1]
         return MockCompletion(self.response_content)
 
 
@@ -78,10 +151,14 @@ class MockAsyncCompletions:
     def __init__(self, response_content: str):
         self.response_content = response_content
         self.calls = []
+        self.streams = []
 
     async def create(self, **kwargs):
         """Mock the async create method and store call arguments."""
         self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            self.streams.append(MockAsyncStream(mock_chunks(self.response_content)))
+            return self.streams[-1]
         return MockCompletion(self.response_content)
 
 
@@ -1,5 +1,11 @@
+import asyncio
+import gc
+import threading
+import time
+import weakref
+
 import pytest
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
 from smartfunc import backend, async_backend
 
 
@@ -51,6 +57,61 @@ def test_structured_output(mock_client_factory):
     assert schema["additionalProperties"] is False
 
 
+def test_schema_built_once_per_model(mock_client_factory, monkeypatch):
+    """Test that backends sharing a response_format build its schema once."""
+    client = mock_client_factory('{"label": "test"}')
+
+    class Label(BaseModel):
+        label: str
+
+    schema_calls = []
+    original = Label.model_json_schema
+
+    def counting_schema(*args, **kwargs):
+        schema_calls.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(Label, "model_json_schema", counting_schema)
+
+    def classify(text: str) -> str:
+        return f"Classify: {text}"
+
+    backend(client, model="gpt-4o-mini", response_format=Label).run(classify, "a")
+    backend(client, model="gpt-4o", response_format=Label).run(classify, "b")
+
+    assert len(schema_calls) == 1
+    first, second = client.calls[0]["response_format"], client.calls[1]["response_format"]
+    assert first == second
+    assert first is not second
+
+
+def test_schema_cache_does_not_keep_models_alive(mock_client_factory):
+    """Test that dynamically created response formats can be garbage collected."""
+    client = mock_client_factory('{"value": 1}')
+
+    def generate(text: str) -> str:
+        return text
+
+    Dynamic = create_model("Dynamic", value=(int, ...))
+    backend(client, model="gpt-4o-mini", response_format=Dynamic).run(generate, "a")
+    ref = weakref.ref(Dynamic)
+    del Dynamic
+    gc.collect()
+
+    assert ref() is None
+
+
+@pytest.mark.parametrize("response_format", [dict, Summary(summary="", pros=[], cons=[]), "Summary"])
+def test_invalid_response_format(mock_client_factory, response_format):
+    """Test that a non-Pydantic response_format is rejected up front."""
+    client = mock_client_factory()
+
+    with pytest.raises(TypeError, match="must be a Pydantic BaseModel subclass"):
+        backend(client, model="gpt-4o-mini", response_format=response_format)
+    with pytest.raises(TypeError, match="must be a Pydantic BaseModel subclass"):
+        async_backend(client, model="gpt-4o-mini", response_format=response_format)
+
+
 def test_system_prompt(mock_client_factory):
     """Test that system prompt is correctly passed."""
     client = mock_client_factory()
@@ -108,6 +169,70 @@ def test_run_method(mock_client_factory):
     assert client.calls[0]["messages"][0]["content"] == "Process: test"
 
 
+def test_batch(mock_client_factory):
+    """Test running many inputs through the sync backend."""
+    client = mock_client_factory()
+
+    backend_instance = backend(client, model="gpt-4o-mini")
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    results = backend_instance.batch(generate, [("cats",), ("dogs",), ("birds",)])
+
+    assert results == ["test response"] * 3
+    contents = sorted(call["messages"][0]["content"] for call in client.calls)
+    assert contents == ["Write about birds", "Write about cats", "Write about dogs"]
+
+
+def test_batch_max_concurrency(mock_client_factory):
+    """Test that batch never has more than max_concurrency requests in flight."""
+    client = mock_client_factory()
+    create = client.chat.completions.create
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def slow_create(**kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    backend_instance = backend(client, model="gpt-4o-mini")
+
+    def generate(i: int) -> str:
+        return f"Item {i}"
+
+    results = backend_instance.batch(generate, [(i,) for i in range(10)], max_concurrency=3)
+
+    assert len(results) == 10
+    assert peak == 3
+
+
+def test_run_picks_up_backend_changes(mock_client_factory):
+    """Test that run uses the backend settings as they are at call time."""
+    client = mock_client_factory()
+
+    backend_instance = backend(client, model="gpt-4o-mini", system="old")
+
+    def generate(prompt: str) -> str:
+        return f"Process: {prompt}"
+
+    backend_instance.run(generate, "a")
+    backend_instance.system = "new"
+    backend_instance.run(generate, "b")
+
+    assert [c["messages"][0]["content"] for c in client.calls] == ["old", "new"]
+    assert [c["messages"][1]["content"] for c in client.calls] == ["Process: a", "Process: b"]
+
+
 @pytest.mark.asyncio
 async def test_async_basic(async_mock_client_factory):
     """Test async backend basic functionality."""
@@ -124,6 +249,40 @@ async def test_async_basic(async_mock_client_factory):
     assert len(client.calls) == 1
 
 
+@pytest.mark.asyncio
+async def test_async_prompt_function(async_mock_client_factory):
+    """Test that async_backend awaits async prompt functions."""
+    client = async_mock_client_factory()
+
+    @async_backend(client, model="gpt-4o-mini")
+    async def generate_text(topic: str) -> str:
+        await asyncio.sleep(0)
+        return f"Write about {topic}"
+
+    result = await generate_text("testing")
+
+    assert result == "test response"
+    assert client.calls[0]["messages"][0]["content"] == "Write about testing"
+
+
+@pytest.mark.asyncio
+async def test_async_map_interleaves_prompt_functions(async_mock_client_factory):
+    """Test that async prompt functions run concurrently under map."""
+    client = async_mock_client_factory()
+    events = []
+
+    async def generate(i: int) -> str:
+        events.append(("start", i))
+        await asyncio.sleep(0.01)
+        events.append(("end", i))
+        return f"Item {i}"
+
+    results = await async_backend(client, model="gpt-4o-mini").map(generate, [(0,), (1,)])
+
+    assert results == ["test response"] * 2
+    assert events[:2] == [("start", 0), ("start", 1)]
+
+
 @pytest.mark.asyncio
 async def test_async_structured_output(async_mock_client_factory):
     """Test async backend with structured output."""
@@ -158,6 +317,59 @@ async def test_async_run_method(async_mock_client_factory):
     assert result == "test response"
 
 
+@pytest.mark.asyncio
+async def test_async_map(async_mock_client_factory):
+    """Test running many inputs through the async backend."""
+    client = async_mock_client_factory()
+
+    backend_instance = async_backend(client, model="gpt-4o-mini")
+
+    def generate(topic: str, style: str) -> str:
+        return f"Write a {style} piece about {topic}"
+
+    results = await backend_instance.map(
+        generate, [("cats", "short"), ("dogs", "long"), ("birds", "formal")]
+    )
+
+    assert results == ["test response"] * 3
+    contents = [call["messages"][0]["content"] for call in client.calls]
+    assert contents == [
+        "Write a short piece about cats",
+        "Write a long piece about dogs",
+        "Write a formal piece about birds",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_map_max_concurrency(async_mock_client_factory):
+    """Test that map never has more than max_concurrency requests in flight."""
+    client = async_mock_client_factory()
+    create = client.chat.completions.create
+    in_flight = 0
+    peak = 0
+
+    async def slow_create(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return await create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    backend_instance = async_backend(client, model="gpt-4o-mini")
+
+    def generate(i: int) -> str:
+        return f"Item {i}"
+
+    results = await backend_instance.map(generate, [(i,) for i in range(10)], max_concurrency=3)
+
+    assert len(results) == 10
+    assert len(client.calls) == 10
+    assert peak == 3
+
+
 def test_multiple_arguments(mock_client_factory):
     """Test function with multiple arguments."""
     client = mock_client_factory()
@@ -0,0 +1,701 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import UserDict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pydantic import BaseModel
+from smartfunc import backend, async_backend, InMemoryCache
+
+
+class Summary(BaseModel):
+    """Test model for structured output."""
+    summary: str
+
+
+def test_cache_hit_skips_api_call(mock_client_factory):
+    """Test that identical calls are answered from the cache."""
+    client = mock_client_factory()
+    cache = {}
+
+    @backend(client, model="gpt-4o-mini", cache=cache)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    assert generate("testing") == "test response"
+    assert generate("testing") == "test response"
+
+    assert len(client.calls) == 1
+    assert len(cache) == 1
+
+
+def test_cache_miss_on_different_prompt(mock_client_factory):
+    """Test that different prompts get their own cache entries."""
+    client = mock_client_factory()
+    cache = {}
+
+    @backend(client, model="gpt-4o-mini", cache=cache)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    generate("cats")
+    generate("dogs")
+
+    assert len(client.calls) == 2
+    assert len(cache) == 2
+
+
+def test_cache_key_depends_on_config(mock_client_factory):
+    """Test that the same prompt with different settings is not shared."""
+    client = mock_client_factory()
+    cache = {}
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    backend(client, model="gpt-4o-mini", cache=cache).run(generate, "cats")
+    backend(client, model="gpt-4o", cache=cache).run(generate, "cats")
+    backend(client, model="gpt-4o", cache=cache, temperature=0.1).run(generate, "cats")
+
+    assert len(client.calls) == 3
+    assert len(cache) == 3
+
+
+def test_cache_key_depends_on_response_format(mock_client_factory):
+    """Test that plain and structured calls for the same prompt are cached apart."""
+    client = mock_client_factory('{"summary": "cached"}')
+    cache = {}
+
+    def summarize(text: str) -> str:
+        return f"Summarize: {text}"
+
+    plain = backend(client, model="gpt-4o-mini", cache=cache).run(summarize, "cats")
+    structured = backend(
+        client, model="gpt-4o-mini", response_format=Summary, cache=cache
+    ).run(summarize, "cats")
+
+    assert plain == '{"summary": "cached"}'
+    assert isinstance(structured, Summary)
+    assert len(client.calls) == 2
+
+
+def test_cache_key_ignores_dict_order(mock_client_factory):
+    """Test that message dicts with the same content share a cache entry."""
+    client = mock_client_factory()
+    cache = {}
+
+    @backend(client, model="gpt-4o-mini", cache=cache)
+    def chat(flip: bool) -> list:
+        if flip:
+            return [{"content": "Hello", "role": "user"}]
+        return [{"role": "user", "content": "Hello"}]
+
+    chat(False)
+    chat(True)
+
+    assert len(client.calls) == 1
+
+
+class Tag:
+    """Object whose str() hides its value."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return "tag"
+
+    def __repr__(self):
+        return f"Tag({self.value!r})"
+
+
+def test_cache_key_distinguishes_objects_with_same_str(mock_client_factory):
+    """Test that non-JSON values are not collapsed to their str()."""
+    client = mock_client_factory()
+    cache = {}
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    backend(client, model="gpt-4o-mini", cache=cache, metadata=Tag(1)).run(generate, "cats")
+    backend(client, model="gpt-4o-mini", cache=cache, metadata=Tag(2)).run(generate, "cats")
+
+    assert len(client.calls) == 2
+
+
+def test_cache_key_serializes_pydantic_values(mock_client_factory):
+    """Test that equal pydantic values in a request share a cache entry."""
+    client = mock_client_factory()
+    cache = {}
+
+    @backend(client, model="gpt-4o-mini", cache=cache)
+    def chat(summary: Summary) -> list:
+        return [{"role": "user", "content": "Expand this", "context": summary}]
+
+    chat(Summary(summary="a"))
+    chat(Summary(summary="a"))
+    chat(Summary(summary="b"))
+
+    assert len(client.calls) == 2
+
+
+class Tagged(BaseModel):
+    """Test model with a mutable field."""
+    items: list[str]
+
+
+def test_cache_structured_output(mock_client_factory):
+    """Test that structured cache hits come back as models."""
+    client = mock_client_factory('{"summary": "cached"}')
+
+    @backend(client, model="gpt-4o-mini", response_format=Summary, cache={})
+    def summarize(text: str) -> Summary:
+        return f"Summarize: {text}"
+
+    first = summarize("pokemon")
+    second = summarize("pokemon")
+
+    assert isinstance(second, Summary)
+    assert second == first
+    assert len(client.calls) == 1
+
+
+@pytest.mark.parametrize("cache", [{}, InMemoryCache()])
+def test_mutating_cached_result_does_not_corrupt_cache(mock_client_factory, cache):
+    """Test that every cache hit gets its own instance."""
+    client = mock_client_factory('{"items": ["a"]}')
+
+    @backend(client, model="gpt-4o-mini", response_format=Tagged, cache=cache)
+    def tag(text: str) -> Tagged:
+        return f"Tag: {text}"
+
+    tag("pokemon").items.append("MUTATED")
+    hit = tag("pokemon")
+    hit.items.append("MUTATED")
+
+    assert tag("pokemon").items == ["a"]
+    assert len(client.calls) == 1
+
+
+def test_cache_stores_response_text(mock_client_factory):
+    """Test that the cache holds the JSON text and hits validate it into a new model."""
+    client = mock_client_factory('{"summary": "cached"}')
+    cache = UserDict()
+
+    @backend(client, model="gpt-4o-mini", response_format=Summary, cache=cache)
+    def summarize(text: str) -> Summary:
+        return f"Summarize: {text}"
+
+    first = summarize("pokemon")
+    second = summarize("pokemon")
+
+    assert list(cache.values()) == ['{"summary": "cached"}']
+    assert isinstance(second, Summary)
+    assert second == first
+    assert second is not first
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_cache_hit(async_mock_client_factory):
+    """Test that the async backend also uses the cache."""
+    client = async_mock_client_factory()
+    cache = {}
+
+    @async_backend(client, model="gpt-4o-mini", cache=cache)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    assert await generate("testing") == "test response"
+    assert await generate("testing") == "test response"
+
+    assert len(client.calls) == 1
+
+
+def test_cache_true_uses_in_memory_cache(mock_client_factory):
+    """Test that cache=True sets up an InMemoryCache."""
+    client = mock_client_factory()
+
+    backend_instance = backend(client, model="gpt-4o-mini", cache=True)
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    backend_instance.run(generate, "cats")
+    backend_instance.run(generate, "cats")
+
+    assert isinstance(backend_instance.cache, InMemoryCache)
+    assert backend_instance.cache.hits == 1
+    assert backend_instance.cache.misses == 1
+    assert len(client.calls) == 1
+
+
+def test_cache_false_disables_cache(mock_client_factory):
+    """Test that cache=False means no caching."""
+    client = mock_client_factory()
+
+    backend_instance = backend(client, model="gpt-4o-mini", cache=False)
+
+    assert backend_instance.cache is None
+
+
+def test_cache_path_requires_diskcache(mock_client_factory, monkeypatch, tmp_path):
+    """Test that a path cache gives a helpful error without diskcache."""
+    monkeypatch.setitem(sys.modules, "diskcache", None)
+
+    with pytest.raises(ImportError, match="requires diskcache"):
+        backend(mock_client_factory(), model="gpt-4o-mini", cache=str(tmp_path))
+
+
+def test_cache_path_uses_diskcache(mock_client_factory, tmp_path):
+    """Test that a path cache persists responses with diskcache."""
+    diskcache = pytest.importorskip("diskcache")
+    client = mock_client_factory()
+
+    backend_instance = backend(client, model="gpt-4o-mini", cache=str(tmp_path))
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    backend_instance.run(generate, "cats")
+    backend_instance.run(generate, "cats")
+
+    assert isinstance(backend_instance.cache, diskcache.Cache)
+    assert len(client.calls) == 1
+
+
+def test_cache_path_shares_handle(mock_client_factory, tmp_path, monkeypatch):
+    """Test that backends using the same directory share one diskcache handle."""
+    pytest.importorskip("diskcache")
+    client = mock_client_factory()
+    monkeypatch.chdir(tmp_path)
+
+    first = backend(client, model="gpt-4o-mini", cache="responses")
+    second = async_backend(client, model="gpt-4o-mini", cache=str(tmp_path / "responses"))
+    other = backend(client, model="gpt-4o-mini", cache="other")
+
+    assert first.cache is second.cache
+    assert first.cache is not other.cache
+
+
+def test_cache_path_structured_output(mock_client_factory, tmp_path):
+    """Test that structured outputs come back from diskcache as models."""
+    pytest.importorskip("diskcache")
+    client = mock_client_factory('{"summary": "cached"}')
+
+    backend_instance = backend(
+        client, model="gpt-4o-mini", response_format=Summary, cache=str(tmp_path)
+    )
+
+    def summarize(text: str) -> str:
+        return f"Summarize: {text}"
+
+    backend_instance.run(summarize, "pokemon")
+    result = backend_instance.run(summarize, "pokemon")
+
+    assert result == Summary(summary="cached")
+    assert len(client.calls) == 1
+
+
+def test_in_memory_cache_evicts_least_recently_used():
+    """Test that the oldest unused entry is evicted first."""
+    cache = InMemoryCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert "a" in cache
+    cache["c"] = 3
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert len(cache) == 2
+
+
+def test_in_memory_cache_expires_entries(monkeypatch):
+    """Test that entries are gone once their ttl has passed."""
+    now = 1000.0
+    monkeypatch.setattr("smartfunc.time.monotonic", lambda: now)
+
+    cache = InMemoryCache(ttl=10)
+    cache["a"] = 1
+    assert cache.get("a") == 1
+
+    now = 1010.0
+    assert cache.get("a", "missing") == "missing"
+    assert "a" not in cache
+    with pytest.raises(KeyError):
+        cache["a"]
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_in_memory_cache_hides_expired_entries(monkeypatch):
+    """Test that expired entries are not counted or iterated over."""
+    now = 1000.0
+    monkeypatch.setattr("smartfunc.time.monotonic", lambda: now)
+
+    cache = InMemoryCache(ttl=10)
+    cache["old"] = 1
+    now = 1005.0
+    cache["new"] = 2
+    now = 1012.0
+
+    assert len(cache) == 1
+    assert list(cache) == ["new"]
+    assert dict(cache.items()) == {"new": 2}
+    assert list(cache.values()) == [2]
+
+
+def test_in_memory_cache_without_ttl(monkeypatch):
+    """Test that ttl=None keeps entries until they are evicted."""
+    now = 1000.0
+    monkeypatch.setattr("smartfunc.time.monotonic", lambda: now)
+
+    cache = InMemoryCache(maxsize=2, ttl=None)
+    cache["a"] = 1
+    now = 1e9
+
+    assert cache.get("a") == 1
+    assert len(cache) == 1
+    cache["b"] = 2
+    cache["c"] = 3
+    assert list(cache) == ["b", "c"]
+
+
+class StaleCache(MutableMapping):
+    """Cache whose membership check is out of date, like an entry evicted right after it."""
+
+    def __init__(self):
+        self._data = {}
+
+    def __contains__(self, key):
+        return True
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def test_cache_lookup_survives_eviction_race(mock_client_factory):
+    """Test that an entry vanishing between check and read is a plain miss."""
+    client = mock_client_factory()
+
+    @backend(client, model="gpt-4o-mini", cache=StaleCache())
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    assert generate("cats") == "test response"
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_cache_lookup_survives_eviction_race(async_mock_client_factory):
+    """Test that the async backend also treats a vanished entry as a miss."""
+    client = async_mock_client_factory()
+
+    @async_backend(client, model="gpt-4o-mini", cache=StaleCache())
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    assert await generate("cats") == "test response"
+    assert len(client.calls) == 1
+
+
+def test_concurrent_identical_calls_share_one_request(mock_client_factory):
+    """Test that identical calls in flight at the same time make one API call."""
+    client = mock_client_factory()
+    create = client.chat.completions.create
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_create(**kwargs):
+        started.set()
+        release.wait(timeout=5)
+        return create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    @backend(client, model="gpt-4o-mini", cache=True)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        first = pool.submit(generate, "cats")
+        started.wait(timeout=5)
+        others = [pool.submit(generate, "cats") for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        results = [first.result()] + [f.result() for f in others]
+
+    assert results == ["test response"] * 4
+    assert len(client.calls) == 1
+
+
+def test_concurrent_identical_calls_share_errors(mock_client_factory):
+    """Test that a failed shared call raises for every waiter and is not cached."""
+    client = mock_client_factory()
+    started = threading.Event()
+    release = threading.Event()
+    attempts = []
+
+    def failing_create(**kwargs):
+        attempts.append(kwargs)
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError("provider down")
+
+    client.chat.completions.create = failing_create
+    cache = {}
+
+    @backend(client, model="gpt-4o-mini", cache=cache)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(generate, "cats")
+        started.wait(timeout=5)
+        second = pool.submit(generate, "cats")
+        time.sleep(0.05)
+        release.set()
+        for future in (first, second):
+            with pytest.raises(RuntimeError, match="provider down"):
+                future.result()
+
+    assert len(attempts) == 1
+    assert cache == {}
+
+
+@pytest.mark.asyncio
+async def test_async_concurrent_identical_calls_share_one_request(async_mock_client_factory):
+    """Test that concurrent identical async calls make one API call."""
+    client = async_mock_client_factory()
+    create = client.chat.completions.create
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.01)
+        return await create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    @async_backend(client, model="gpt-4o-mini", cache=True)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    results = await asyncio.gather(*[generate("cats") for _ in range(5)])
+
+    assert results == ["test response"] * 5
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_concurrent_identical_calls_share_errors(async_mock_client_factory):
+    """Test that a failed shared async call raises for every waiter."""
+    client = async_mock_client_factory()
+    attempts = []
+
+    async def failing_create(**kwargs):
+        attempts.append(kwargs)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    client.chat.completions.create = failing_create
+
+    @async_backend(client, model="gpt-4o-mini", cache={})
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    results = await asyncio.gather(*[generate("cats") for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_concurrent_waiters_get_own_instances(async_mock_client_factory):
+    """Test that callers sharing one in-flight request don't share the result."""
+    client = async_mock_client_factory('{"items": ["a"]}')
+    create = client.chat.completions.create
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.01)
+        return await create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    @async_backend(client, model="gpt-4o-mini", response_format=Tagged, cache=True)
+    def tag(text: str) -> Tagged:
+        return f"Tag: {text}"
+
+    results = await asyncio.gather(*[tag("pokemon") for _ in range(3)])
+
+    assert len(client.calls) == 1
+    assert len({id(result) for result in results}) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_cancelled_leader_does_not_cancel_waiters(async_mock_client_factory):
+    """Test that cancelling the caller doing the request leaves other callers running."""
+    client = async_mock_client_factory()
+    create = client.chat.completions.create
+    attempts = []
+
+    async def slow_create(**kwargs):
+        attempts.append(kwargs)
+        await asyncio.sleep(0.05)
+        return await create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    @async_backend(client, model="gpt-4o-mini", cache=True)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    leader = asyncio.create_task(generate("cats"))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(generate("cats")) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    results = await asyncio.gather(*waiters)
+
+    assert leader.cancelled()
+    assert results == ["test response"] * 2
+    assert not any(waiter.cancelled() for waiter in waiters)
+    assert len(attempts) == 2
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_cancelled_waiter_does_not_cancel_leader(async_mock_client_factory):
+    """Test that cancelling a waiting caller leaves the shared request alone."""
+    client = async_mock_client_factory()
+    create = client.chat.completions.create
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.05)
+        return await create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    @async_backend(client, model="gpt-4o-mini", cache=True)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    leader = asyncio.create_task(generate("cats"))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(generate("cats"))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+
+    assert await leader == "test response"
+    assert waiter.cancelled()
+    assert len(client.calls) == 1
+
+
+class FailingWriteCache(UserDict):
+    """Cache whose writes always fail, like a full or read-only disk."""
+
+    def __setitem__(self, key, value):
+        raise OSError("disk full")
+
+
+def test_failing_cache_write_does_not_block_later_calls(mock_client_factory):
+    """Test that a failed cache write leaves nothing in flight."""
+    client = mock_client_factory()
+
+    @backend(client, model="gpt-4o-mini", cache=FailingWriteCache())
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        for _ in range(2):
+            with pytest.raises(OSError, match="disk full"):
+                pool.submit(generate, "cats").result(timeout=5)
+
+    assert len(client.calls) == 2
+
+
+def test_failing_cache_write_still_answers_waiters(mock_client_factory):
+    """Test that callers waiting on a request get its result if caching it fails."""
+    client = mock_client_factory()
+    create = client.chat.completions.create
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_create(**kwargs):
+        started.set()
+        release.wait(timeout=5)
+        return create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    @backend(client, model="gpt-4o-mini", cache=FailingWriteCache())
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(generate, "cats")
+        started.wait(timeout=5)
+        second = pool.submit(generate, "cats")
+        time.sleep(0.05)
+        release.set()
+        with pytest.raises(OSError, match="disk full"):
+            first.result(timeout=5)
+        assert second.result(timeout=5) == "test response"
+
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_failing_cache_write_does_not_block_later_calls(async_mock_client_factory):
+    """Test that a failed cache write leaves nothing in flight for the async backend."""
+    client = async_mock_client_factory()
+
+    @async_backend(client, model="gpt-4o-mini", cache=FailingWriteCache())
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    for _ in range(2):
+        with pytest.raises(OSError, match="disk full"):
+            await asyncio.wait_for(generate("cats"), timeout=5)
+
+    assert len(client.calls) == 2
+
+
+def test_async_identical_calls_on_separate_event_loops(async_mock_client_factory):
+    """Test that identical calls running on two event loops at once don't share futures."""
+    client = async_mock_client_factory()
+    create = client.chat.completions.create
+    both_started = threading.Barrier(2)
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.05)
+        return await create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    @async_backend(client, model="gpt-4o-mini", cache=True)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    def run_in_own_loop():
+        both_started.wait(timeout=5)
+        return asyncio.run(generate("cats"))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = [pool.submit(run_in_own_loop) for _ in range(2)]
+        assert [r.result(timeout=5) for r in results] == ["test response"] * 2
@@ -0,0 +1,226 @@
+import pytest
+from pydantic import BaseModel
+from smartfunc import backend, async_backend
+
+
+class Summary(BaseModel):
+    """Test model for structured output."""
+    summary: str
+
+
+def test_stream_yields_text(mock_client_factory):
+    """Test that a streamed function yields the response piece by piece."""
+    client = mock_client_factory("a streamed test response")
+
+    llm = backend(client, model="gpt-4o-mini")
+
+    @llm.stream
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = list(generate("testing"))
+
+    assert chunks == ["a ", "streamed ", "test ", "response"]
+    assert client.calls[0]["stream"] is True
+    assert client.calls[0]["messages"][0]["content"] == "Write about testing"
+
+
+def test_stream_sends_request_on_call(mock_client_factory):
+    """Test that the request goes out before the stream is consumed."""
+    client = mock_client_factory()
+
+    @backend(client, model="gpt-4o-mini").stream
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = generate("testing")
+
+    assert len(client.calls) == 1
+    assert "".join(chunks) == "test response"
+
+
+def test_stream_closed_when_consumer_stops_early(mock_client_factory):
+    """Test that breaking out of a stream closes the underlying response."""
+    client = mock_client_factory("a streamed test response")
+
+    @backend(client, model="gpt-4o-mini").stream
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = generate("testing")
+    assert next(chunks) == "a "
+    chunks.close()
+
+    assert client.chat.completions.streams[0].closed
+
+
+def test_stream_closed_when_exhausted(mock_client_factory):
+    """Test that a fully read stream is closed."""
+    client = mock_client_factory()
+
+    @backend(client, model="gpt-4o-mini").stream
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    list(generate("testing"))
+
+    assert client.chat.completions.streams[0].closed
+
+
+def test_stream_kwarg_enables_streaming(mock_client_factory):
+    """Test that stream=True on the backend decorates for streaming."""
+    client = mock_client_factory()
+
+    @backend(client, model="gpt-4o-mini", system="You are helpful", stream=True)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    assert "".join(generate("testing")) == "test response"
+    assert client.calls[0]["messages"][0]["role"] == "system"
+
+
+def test_stream_structured_output(mock_client_factory):
+    """Test that streamed structured output adds up to valid JSON."""
+    client = mock_client_factory('{"summary": "streamed test"}')
+
+    @backend(client, model="gpt-4o-mini", response_format=Summary).stream
+    def summarize(text: str) -> str:
+        return f"Summarize: {text}"
+
+    text = "".join(summarize("pokemon"))
+
+    assert Summary.model_validate_json(text).summary == "streamed test"
+    assert client.calls[0]["response_format"]["type"] == "json_schema"
+
+
+def test_stream_function_must_return_string(mock_client_factory):
+    """Test that streamed functions must also return a string or list."""
+    client = mock_client_factory()
+
+    @backend(client, model="gpt-4o-mini").stream
+    def bad_function() -> str:
+        return 123
+
+    with pytest.raises(ValueError, match="must return either a string prompt or a list"):
+        bad_function()
+
+
+@pytest.mark.asyncio
+async def test_async_stream_yields_text(async_mock_client_factory):
+    """Test that the async backend streams the response piece by piece."""
+    client = async_mock_client_factory("a streamed test response")
+
+    @async_backend(client, model="gpt-4o-mini").stream
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = [chunk async for chunk in generate("testing")]
+
+    assert chunks == ["a ", "streamed ", "test ", "response"]
+    assert client.calls[0]["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_async_stream_closed_when_consumer_stops_early(async_mock_client_factory):
+    """Test that stopping an async stream early closes the underlying response."""
+    client = async_mock_client_factory("a streamed test response")
+
+    @async_backend(client, model="gpt-4o-mini").stream
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = generate("testing")
+    assert await chunks.__anext__() == "a "
+    await chunks.aclose()
+
+    assert client.chat.completions.streams[0].closed
+
+
+@pytest.mark.asyncio
+async def test_async_stream_kwarg_enables_streaming(async_mock_client_factory):
+    """Test that stream=True on the async backend decorates for streaming."""
+    client = async_mock_client_factory()
+
+    @async_backend(client, model="gpt-4o-mini", stream=True)
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = [chunk async for chunk in generate("testing")]
+
+    assert "".join(chunks) == "test response"
+
+
+@pytest.mark.asyncio
+async def test_async_stream_prompt_function(async_mock_client_factory):
+    """Test that async streaming awaits async prompt functions."""
+    client = async_mock_client_factory()
+
+    @async_backend(client, model="gpt-4o-mini").stream
+    async def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = [chunk async for chunk in generate("testing")]
+
+    assert "".join(chunks) == "test response"
+    assert client.calls[0]["messages"][0]["content"] == "Write about testing"
+
+
+def test_stream_run(mock_client_factory):
+    """Test that run hands back the stream when stream=True."""
+    client = mock_client_factory()
+
+    backend_instance = backend(client, model="gpt-4o-mini", stream=True)
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    chunks = list(backend_instance.run(generate, "testing"))
+
+    assert chunks == ["test ", "response"]
+
+
+def test_stream_batch_collects_text(mock_client_factory):
+    """Test that batch collects every stream into its full text."""
+    client = mock_client_factory()
+
+    backend_instance = backend(client, model="gpt-4o-mini", stream=True)
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    results = backend_instance.batch(generate, [("cats",), ("dogs",)])
+
+    assert results == ["test response"] * 2
+    assert all(call["stream"] is True for call in client.calls)
+
+
+@pytest.mark.asyncio
+async def test_async_stream_run(async_mock_client_factory):
+    """Test that the async run returns the stream without awaiting it."""
+    client = async_mock_client_factory()
+
+    backend_instance = async_backend(client, model="gpt-4o-mini", stream=True)
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    stream = await backend_instance.run(generate, "testing")
+    chunks = [chunk async for chunk in stream]
+
+    assert chunks == ["test ", "response"]
+
+
+@pytest.mark.asyncio
+async def test_async_stream_map_collects_text(async_mock_client_factory):
+    """Test that map collects every async stream into its full text."""
+    client = async_mock_client_factory()
+
+    backend_instance = async_backend(client, model="gpt-4o-mini", stream=True)
+
+    def generate(topic: str) -> str:
+        return f"Write about {topic}"
+
+    results = await backend_instance.map(generate, [("cats",), ("dogs",)])
+
+    assert results == ["test response"] * 2
+    assert len(client.calls) == 2